@@ -0,0 +1,36 @@
+"""Pure string helpers called once per video, kept free of other imports so mypyc can compile them"""
+import re
+
+_VIDEO_ID_CHARS = frozenset('0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz_-')
+_INVALID_CHARS_TABLE = str.maketrans(dict.fromkeys('<>:"/\\|?*', '_'))
+_VIDEO_ID_RE = re.compile(r'(?:v=|/)([0-9A-Za-z_-]{11})|^([0-9A-Za-z_-]{11})$')
+_PLAYLIST_RE = re.compile(r'/playlist\?|[?&]list=[0-9A-Za-z_-]+')
+_VIDEO_URL_RE = re.compile(r'[?&]v=|youtu\.be/|/(?:embed|shorts|live|v)/')
+
+def sanitize_filename(filename: str) -> str:
+    """Remove invalid characters from filename"""
+    return filename.translate(_INVALID_CHARS_TABLE).strip('. ')[:200].rstrip('. ') or 'untitled'
+
+def extract_video_id(url: str) -> str:
+    """Extract video ID from YouTube URL"""
+    if len(url) == 11 and _VIDEO_ID_CHARS.issuperset(url):
+        return url
+    
+    if 'v=' in url:
+        start = url.index('v=') + 2
+        candidate = url[start:start + 11]
+        if len(candidate) == 11 and _VIDEO_ID_CHARS.issuperset(candidate):
+            return candidate
+    
+    match = _VIDEO_ID_RE.search(url)
+    if match:
+        return match.group(1) or match.group(2)
+    
+    raise ValueError(f"Could not extract video ID from URL: {url}")
+
+def is_playlist_url(url: str, prefer_playlist: bool = False) -> bool:
+    """Check whether a URL points at a playlist rather than a single video in one"""
+    if not _PLAYLIST_RE.search(url):
+        return False
+    
+    return prefer_playlist or not _VIDEO_URL_RE.search(url)
@@ -1,68 +1,98 @@
+import functools
 import os
-import re
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
 from pathlib import Path
-from typing import List, Optional
+from typing import List, Optional, Set, Tuple
 
 import typer
+from requests import Session
+from requests.adapters import HTTPAdapter
 from rich import print
 from rich.console import Console
 from rich.progress import Progress, SpinnerColumn, TextColumn
+from urllib3.util.retry import Retry
 from youtube_transcript_api import YouTubeTranscriptApi
-from youtube_transcript_api.formatters import TextFormatter
 from youtube_transcript_api.proxies import WebshareProxyConfig
 import yt_dlp
 
+from _fastpath import extract_video_id, is_playlist_url, sanitize_filename
+from writer import TranscriptWriter, compression_supported, io_uring_supported, write_lines
+
+try:
+    import diskcache
+except ImportError:
+    diskcache = None
+
 app = typer.Typer(help="Download YouTube video transcripts and videos")
 console = Console()
+_local = threading.local()
 
-def sanitize_filename(filename: str) -> str:
-    """Remove invalid characters from filename"""
-    invalid_chars = r'[<>:"/\\|?*]'
-    sanitized = re.sub(invalid_chars, '_', filename)
-    sanitized = sanitized.strip('. ')
-    
-    if not sanitized:
-        sanitized = "untitled"
+CACHE_DIR = Path.home() / ".cache" / "ytscribe"
+VIDEO_INFO_TTL = 24 * 60 * 60
+PROGRESS_BATCH_SIZE = 8
+PROGRESS_INTERVAL = 0.25
+HTTP_POOL_SIZE = 4
+HTTP_RETRIES = 3
+
+@functools.lru_cache(maxsize=1)
+def get_disk_cache() -> Optional["diskcache.Cache"]:
+    """Open the persistent metadata cache, if diskcache is installed"""
+    if diskcache is None:
+        return None
     
-    return sanitized[:200] if len(sanitized) > 200 else sanitized
+    try:
+        return diskcache.Cache(str(CACHE_DIR))
+    except Exception as e:
+        console.print(f"[yellow]Warning: Could not open cache at {CACHE_DIR} ({e}), caching disabled[/yellow]")
+        return None
 
-def extract_video_id(url: str) -> str:
-    """Extract video ID from YouTube URL"""
-    patterns = [
-        r'(?:v=|\/)([0-9A-Za-z_-]{11}).*',
-        r'(?:embed\/)([0-9A-Za-z_-]{11})',
-        r'(?:v\/)([0-9A-Za-z_-]{11})',
-        r'^([0-9A-Za-z_-]{11})$'
-    ]
+def get_ydl(ydl_opts: dict) -> yt_dlp.YoutubeDL:
+    """Get a reusable yt-dlp instance for the current thread and options"""
+    instances = getattr(_local, 'ydl_instances', None)
+    if instances is None:
+        instances = _local.ydl_instances = {}
     
-    for pattern in patterns:
-        match = re.search(pattern, url)
-        if match:
-            return match.group(1)
+    key = tuple(sorted(ydl_opts.items()))
+    ydl = instances.get(key)
+    if ydl is None:
+        ydl = instances[key] = yt_dlp.YoutubeDL(ydl_opts)
     
-    raise ValueError(f"Could not extract video ID from URL: {url}")
+    return ydl
 
+@functools.lru_cache(maxsize=4096)
 def get_video_info(video_id: str) -> dict:
     """Get video information using yt-dlp"""
+    cache = get_disk_cache()
+    cache_key = f"video_info:{video_id}"
+    if cache is not None:
+        cached = cache.get(cache_key)
+        if cached is not None:
+            return cached
+    
     ydl_opts = {
         'quiet': True,
         'no_warnings': True,
         'extract_flat': False,
     }
     
-    with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-        try:
-            info = ydl.extract_info(f"https://www.youtube.com/watch?v={video_id}", download=False)
-            if info is not None:
-                return {
-                    'title': info.get('title', f'video_{video_id}'),
-                    'id': video_id
-                }
-            else:
-                return {'title': f'video_{video_id}', 'id': video_id}
-        except Exception as e:
-            console.print(f"[red]Error getting video info for {video_id}: {e}[/red]")
+    ydl = get_ydl(ydl_opts)
+    try:
+        info = ydl.extract_info(f"https://www.youtube.com/watch?v={video_id}", download=False)
+        if info is not None:
+            video_info = {
+                'title': info.get('title', f'video_{video_id}'),
+                'id': video_id
+            }
+            if cache is not None:
+                cache.set(cache_key, video_info, expire=VIDEO_INFO_TTL)
+            return video_info
+        else:
             return {'title': f'video_{video_id}', 'id': video_id}
+    except Exception as e:
+        console.print(f"[red]Error getting video info for {video_id}: {e}[/red]")
+        return {'title': f'video_{video_id}', 'id': video_id}
 
 def get_playlist_info(playlist_url: str) -> dict:
     """Get playlist information and video IDs"""
@@ -72,79 +102,142 @@ def get_playlist_info(playlist_url: str) -> dict:
         'extract_flat': True,
     }
     
-    with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-        try:
-            info = ydl.extract_info(playlist_url, download=False)
-            if info is not None:
-                return {
-                    'title': info.get('title', 'Unknown Playlist'),
-                    'entries': [entry['id'] for entry in info.get('entries', []) if entry and 'id' in entry]
-                }
-            else:
-                return {'title': 'Unknown Playlist', 'entries': []}
-        except Exception as e:
-            console.print(f"[red]Error getting playlist info: {e}[/red]")
+    ydl = get_ydl(ydl_opts)
+    try:
+        info = ydl.extract_info(playlist_url, download=False)
+        if info is not None:
+            return {
+                'title': info.get('title', 'Unknown Playlist'),
+                'entries': [
+                    {'id': entry['id'], 'title': entry.get('title')}
+                    for entry in info.get('entries', []) if entry and 'id' in entry
+                ]
+            }
+        else:
             return {'title': 'Unknown Playlist', 'entries': []}
+    except Exception as e:
+        console.print(f"[red]Error getting playlist info: {e}[/red]")
+        return {'title': 'Unknown Playlist', 'entries': []}
 
-def download_transcript(video_id: str, download_path: Path, proxy_username: Optional[str] = None, proxy_password: Optional[str] = None, languages: Optional[List[str]] = None) -> bool:
-    """Download transcript for a single video"""
+def create_http_client() -> Session:
+    """Create an HTTP session that keeps connections alive and retries transient errors"""
+    retry = Retry(
+        total=HTTP_RETRIES,
+        backoff_factor=0.5,
+        status_forcelist=[429, 500, 502, 503, 504],
+        allowed_methods=frozenset({'GET', 'POST'}),
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE, max_retries=retry)
+    
+    session = Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+def get_transcript_api(proxy_username: Optional[str] = None, proxy_password: Optional[str] = None) -> YouTubeTranscriptApi:
+    """Get the transcript API client for the current thread, creating it on first use"""
+    ytt_api = getattr(_local, 'ytt_api', None)
+    if ytt_api is not None:
+        return ytt_api
+    
+    if proxy_username and proxy_password:
+        try:
+            proxy_config = WebshareProxyConfig(
+                proxy_username=proxy_username,
+                proxy_password=proxy_password,
+            )
+            ytt_api = YouTubeTranscriptApi(proxy_config=proxy_config, http_client=create_http_client())
+        except Exception as proxy_error:
+            console.print(f"[yellow]Warning: Proxy configuration failed ({proxy_error}), using direct connection[/yellow]")
+            ytt_api = YouTubeTranscriptApi(http_client=create_http_client())
+    else:
+        ytt_api = YouTubeTranscriptApi(http_client=create_http_client())
+    
+    _local.ytt_api = ytt_api
+    return ytt_api
+
+def transcript_filename(title: str, compress: bool = False) -> str:
+    """Get the transcript filename for a sanitized video title"""
+    if compress:
+        return f"{title} transcript.txt.zst"
+    return f"{title} transcript.txt"
+
+def scan_existing_files(path: Path) -> Set[str]:
+    """Get the names of non-empty transcript files already in a directory"""
+    suffixes = (transcript_filename(''), transcript_filename('', compress=True))
     try:
-        video_info = get_video_info(video_id)
-        title = sanitize_filename(video_info['title'])
+        with os.scandir(path) as entries:
+            return {
+                entry.name for entry in entries
+                if entry.name.endswith(suffixes) and entry.is_file() and entry.stat().st_size > 0
+            }
+    except OSError:
+        return set()
+
+def download_transcript(ytt_api: YouTubeTranscriptApi, video_id: str, download_path: Path, languages: Optional[List[str]] = None, title: Optional[str] = None, writer: Optional[TranscriptWriter] = None, existing: Optional[Set[str]] = None, force: bool = False) -> Tuple[bool, Optional[str]]:
+    """Download transcript for a single video, returning whether it succeeded and the resolved title"""
+    try:
+        if title is None:
+            title = get_video_info(video_id)['title']
+        title = sanitize_filename(title)
         
-        if proxy_username and proxy_password:
-            try:
-                proxy_config = WebshareProxyConfig(
-                    proxy_username=proxy_username,
-                    proxy_password=proxy_password,
-                )
-                ytt_api = YouTubeTranscriptApi(proxy_config=proxy_config)
-            except Exception as proxy_error:
-                console.print(f"[yellow]Warning: Proxy configuration failed ({proxy_error}), using direct connection[/yellow]")
-                ytt_api = YouTubeTranscriptApi()
-        else:
-            ytt_api = YouTubeTranscriptApi()
+        filename = transcript_filename(title, writer is not None and writer.compress)
+        file_path = download_path / filename
+        
+        if not force:
+            if existing is not None:
+                already_downloaded = filename in existing
+            else:
+                already_downloaded = file_path.is_file() and file_path.stat().st_size > 0
+            
+            if already_downloaded:
+                console.print(f"[green]✓[/green] Transcript already exists: {filename}")
+                return True, title
         
         if languages:
             transcript = ytt_api.fetch(video_id, languages=languages)
         else:
             transcript = ytt_api.fetch(video_id)
             
-        formatter = TextFormatter()
-        text_formatted = formatter.format_transcript(transcript)
+        lines = [snippet.text for snippet in transcript]
         
         language_info = ""
         if hasattr(transcript, 'language_code') and hasattr(transcript, 'language'):
             language_info = f" ({transcript.language_code}: {transcript.language})"
         
-        filename = f"{title} transcript.txt"
-        file_path = download_path / filename
-        
-        with open(file_path, 'w', encoding='utf-8') as f:
-            f.write(text_formatted)
-        
-        console.print(f"[green]✓[/green] Transcript saved: {filename}{language_info}")
-        return True
+        message = f"[green]✓[/green] Transcript saved: {filename}{language_info}"
+        if writer is not None:
+            writer.submit(file_path, lines, message)
+        else:
+            write_lines(file_path, lines)
+            console.print(message)
+        return True, title
         
     except Exception as e:
         console.print(f"[red]✗[/red] Failed to download transcript for {video_id}: {e}")
-        return False
+        return False, title
 
-def download_video(video_id: str, download_path: Path) -> bool:
-    """Download video using yt-dlp"""
+def download_video(video_id: str, download_path: Path, title: Optional[str] = None) -> bool:
+    """Download video using yt-dlp, looking up the title if not given"""
     try:
-        video_info = get_video_info(video_id)
-        title = sanitize_filename(video_info['title'])
+        if title is None:
+            title = get_video_info(video_id)['title']
+        title = sanitize_filename(title)
         
         ydl_opts = {
-            'outtmpl': str(download_path / f"{title}.%(ext)s"),
             'format': 'best[height<=720]',
             'quiet': True,
             'no_warnings': True,
+            'noprogress': True,
+            'concurrent_fragment_downloads': 8,
+            'retries': 3,
+            'fragment_retries': 3,
         }
         
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            ydl.download([f"https://www.youtube.com/watch?v={video_id}"])
+        ydl = get_ydl(ydl_opts)
+        ydl.params['outtmpl']['default'] = str(download_path / f"{title}.%(ext)s")
+        ydl.download([f"https://www.youtube.com/watch?v={video_id}"])
         
         console.print(f"[green]✓[/green] Video downloaded: {title}")
         return True
@@ -181,6 +274,32 @@ def download(
         "-language", "--languages",
         help="Preferred language codes for transcripts (e.g., 'en', 'es', 'fr'). Multiple languages can be specified in order of preference."
     ),
+    workers: int = typer.Option(
+        8,
+        "-w", "--workers",
+        min=1,
+        help="Number of videos to process concurrently"
+    ),
+    io_uring: bool = typer.Option(
+        False,
+        "--io-uring",
+        help="Batch transcript writes through io_uring (Linux 5.10+, requires liburing)"
+    ),
+    force: bool = typer.Option(
+        False,
+        "-f", "--force",
+        help="Download transcripts again even if they already exist"
+    ),
+    playlist: bool = typer.Option(
+        False,
+        "--playlist",
+        help="Download the whole playlist for URLs that link to a video within a playlist"
+    ),
+    compress: bool = typer.Option(
+        False,
+        "--compress",
+        help="Save transcripts zstd-compressed as .txt.zst (requires zstandard)"
+    ),
 ):
     """Download transcripts (and optionally videos) from YouTube URLs"""
     
@@ -188,6 +307,10 @@ def download(
         console.print("[red]Error: Both -username and -password must be provided together for proxy support[/red]")
         raise typer.Exit(1)
     
+    if compress and not compression_supported():
+        console.print("[red]Error: --compress requires the zstandard package (pip install 'ytscribe[compress]')[/red]")
+        raise typer.Exit(1)
+    
     if location:
         download_path = Path(location).expanduser().resolve()
     else:
@@ -203,60 +326,124 @@ def download(
     if languages:
         console.print(f"[blue]Preferred transcript languages:[/blue] {', '.join(languages)}")
     
+    writer = None
+    if io_uring:
+        if io_uring_supported():
+            try:
+                writer = TranscriptWriter(console, use_io_uring=True, compress=compress)
+                console.print("[blue]Writing transcripts with io_uring[/blue]")
+            except Exception as e:
+                console.print(f"[yellow]Warning: io_uring setup failed ({e}), using regular file writes[/yellow]")
+        else:
+            console.print("[yellow]Warning: io_uring needs Linux 5.10+ and the liburing package, using regular file writes[/yellow]")
+    
+    if writer is None:
+        writer = TranscriptWriter(console, compress=compress)
+    
     total_success = 0
     total_failed = 0
     
-    for url in urls:
-        console.print(f"\n[blue]Processing:[/blue] {url}")
+    def process_video(video_id: str, path: Path, title: Optional[str] = None, existing: Optional[Set[str]] = None) -> bool:
+        ytt_api = get_transcript_api(username, password)
+        success, title = download_transcript(ytt_api, video_id, path, languages, title, writer, existing, force)
         
-        try:
-            if 'playlist' in url or 'list=' in url:
-                playlist_info = get_playlist_info(url)
-                playlist_title = sanitize_filename(playlist_info['title'])
-                playlist_path = download_path / playlist_title
-                playlist_path.mkdir(parents=True, exist_ok=True)
+        if download_video_flag:
+            if not download_video(video_id, path, title):
+                console.print(f"[yellow]Note: Video download failed for {video_id}[/yellow]")
+        
+        return success
+    
+    try:
+        single_urls: List[str] = []
+        playlist_urls: List[str] = []
+        for url in urls:
+            if is_playlist_url(url, playlist):
+                playlist_urls.append(url)
+            else:
+                single_urls.append(url)
+        
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            try:
+                video_futures: List[Future] = []
+                video_ids: Set[str] = set()
                 
-                console.print(f"[yellow]Playlist detected:[/yellow] {playlist_title}")
-                console.print(f"[yellow]Found {len(playlist_info['entries'])} videos[/yellow]")
+                for url in single_urls:
+                    console.print(f"\n[blue]Processing:[/blue] {url}")
+                    
+                    try:
+                        video_id = extract_video_id(url)
+                        if video_id in video_ids:
+                            console.print(f"[yellow]Skipping duplicate video:[/yellow] {video_id}")
+                            continue
+                        
+                        video_ids.add(video_id)
+                        video_futures.append(executor.submit(process_video, video_id, download_path))
+                    
+                    except Exception as e:
+                        console.print(f"[red]Error processing {url}: {e}[/red]")
+                        total_failed += 1
                 
-                with Progress(
-                    SpinnerColumn(),
-                    TextColumn("[progress.description]{task.description}"),
-                    console=console
-                ) as progress:
-                    task = progress.add_task("Processing playlist...", total=len(playlist_info['entries']))
+                for url in playlist_urls:
+                    console.print(f"\n[blue]Processing:[/blue] {url}")
                     
-                    for video_id in playlist_info['entries']:
-                        if download_transcript(video_id, playlist_path, username, password, languages):
-                            total_success += 1
-                        else:
-                            total_failed += 1
+                    try:
+                        playlist_info = get_playlist_info(url)
+                        playlist_title = sanitize_filename(playlist_info['title'])
+                        playlist_path = download_path / playlist_title
+                        playlist_path.mkdir(parents=True, exist_ok=True)
+                        existing = scan_existing_files(playlist_path)
                         
-                        if download_video_flag:
-                            if download_video(video_id, playlist_path):
-                                pass
-                            else:
-                                console.print(f"[yellow]Note: Video download failed for {video_id}[/yellow]")
+                        console.print(f"[yellow]Playlist detected:[/yellow] {playlist_title}")
+                        console.print(f"[yellow]Found {len(playlist_info['entries'])} videos[/yellow]")
                         
-                        progress.advance(task)
-            
-            else:
-                video_id = extract_video_id(url)
-                
-                if download_transcript(video_id, download_path, username, password, languages):
-                    total_success += 1
-                else:
-                    total_failed += 1
+                        with Progress(
+                            SpinnerColumn(),
+                            TextColumn("[progress.description]{task.description}"),
+                            console=console,
+                            refresh_per_second=4
+                        ) as progress:
+                            task = progress.add_task("Processing playlist...", total=len(playlist_info['entries']))
+                            
+                            futures = [
+                                executor.submit(process_video, entry['id'], playlist_path, entry['title'], existing)
+                                for entry in playlist_info['entries']
+                            ]
+                            
+                            completed = 0
+                            last_update = time.monotonic()
+                            for future in as_completed(futures):
+                                if future.result():
+                                    total_success += 1
+                                else:
+                                    total_failed += 1
+                                
+                                completed += 1
+                                now = time.monotonic()
+                                if completed >= PROGRESS_BATCH_SIZE or now - last_update >= PROGRESS_INTERVAL:
+                                    progress.update(task, advance=completed)
+                                    completed = 0
+                                    last_update = now
+                            
+                            progress.update(task, advance=completed)
+                    
+                    except Exception as e:
+                        console.print(f"[red]Error processing {url}: {e}[/red]")
+                        total_failed += 1
                 
-                if download_video_flag:
-                    if download_video(video_id, download_path):
-                        pass
+                for future in as_completed(video_futures):
+                    if future.result():
+                        total_success += 1
                     else:
-                        console.print(f"[yellow]Note: Video download failed for {video_id}[/yellow]")
-        
-        except Exception as e:
-            console.print(f"[red]Error processing {url}: {e}[/red]")
-            total_failed += 1
+                        total_failed += 1
+            except BaseException:
+                # Drop queued videos so Ctrl-C stops the run instead of waiting for the whole backlog
+                executor.shutdown(wait=False, cancel_futures=True)
+                raise
+    finally:
+        writer.close()
+    
+    total_success -= writer.failed
+    total_failed += writer.failed
     
     console.print(f"\n[bold]Summary:[/bold]")
     console.print(f"[green]✓ Successful: {total_success}[/green]")
@@ -0,0 +1,256 @@
+"""Background transcript writer with an optional io_uring backend on Linux"""
+import os
+import platform
+import queue
+import re
+import threading
+from pathlib import Path
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+from rich.console import Console
+
+try:
+    import liburing
+except ImportError:
+    liburing = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+MIN_KERNEL = (5, 10)
+RING_ENTRIES = 256
+WRITE_BUFFER_SIZE = 1 << 16
+ZSTD_LEVEL = 3
+
+def kernel_version() -> Tuple[int, ...]:
+    """Get the running kernel's major and minor version"""
+    match = re.match(r'(\d+)\.(\d+)', platform.release())
+    if not match:
+        return (0, 0)
+    return (int(match.group(1)), int(match.group(2)))
+
+def io_uring_supported() -> bool:
+    """Check whether the io_uring backend can be used on this system"""
+    return liburing is not None and platform.system() == 'Linux' and kernel_version() >= MIN_KERNEL
+
+def compression_supported() -> bool:
+    """Check whether zstd compression is available"""
+    return zstandard is not None
+
+def partial_path(path: Path) -> Path:
+    """Get the temporary path a file is written to before being moved into place"""
+    return path.with_name(f"{path.name}.part")
+
+def _discard(path: Path) -> None:
+    try:
+        os.unlink(path)
+    except OSError:
+        pass
+
+def write_lines(path: Path, lines: Iterable[str], compress: bool = False) -> None:
+    """Stream newline-separated lines to a UTF-8 file without joining them in memory"""
+    tmp_path = partial_path(path)
+    try:
+        if compress:
+            f = zstandard.open(tmp_path, 'wt', cctx=zstandard.ZstdCompressor(level=ZSTD_LEVEL), encoding='utf-8')
+        else:
+            f = open(tmp_path, 'w', encoding='utf-8', buffering=WRITE_BUFFER_SIZE)
+        
+        with f:
+            lines = iter(lines)
+            for line in lines:
+                f.write(line)
+                break
+            for line in lines:
+                f.write('\n')
+                f.write(line)
+        
+        os.replace(tmp_path, path)
+    except BaseException:
+        _discard(tmp_path)
+        raise
+
+def _pwrite_all(fd: int, data: bytes, offset: int) -> None:
+    view = memoryview(data)
+    while view:
+        written = os.pwrite(fd, view, offset)
+        view = view[written:]
+        offset += written
+
+class IoUringWriter:
+    """Write a batch of files with a single io_uring submission"""
+
+    def __init__(self):
+        self._ring = liburing.Ring()
+        self._cqe = liburing.Cqe()
+        liburing.io_uring_queue_init(RING_ENTRIES, self._ring, 0)
+
+    def close(self) -> None:
+        liburing.io_uring_queue_exit(self._ring)
+
+    def write_batch(self, batch: List[Tuple[Path, bytes]]) -> List[Optional[Exception]]:
+        """Write every (path, data) pair, returning the error for each, if any"""
+        fds: List[int] = []
+        errors: List[Optional[Exception]] = []
+
+        tmp_paths = [partial_path(path) for path, _ in batch]
+        for tmp_path in tmp_paths:
+            try:
+                fds.append(os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644))
+                errors.append(None)
+            except OSError as e:
+                fds.append(-1)
+                errors.append(e)
+
+        pending = [i for i, fd in enumerate(fds) if fd >= 0]
+
+        try:
+            if len(pending) == 1:
+                # A lone write gains nothing from the ring, so skip the submission overhead
+                i = pending[0]
+                _pwrite_all(fds[i], batch[i][1], 0)
+            elif pending:
+                self._submit_writes(batch, fds, pending, errors)
+        except Exception as e:
+            for i in pending:
+                errors[i] = errors[i] or e
+        finally:
+            for fd in fds:
+                if fd >= 0:
+                    os.close(fd)
+
+        for i in pending:
+            if errors[i] is None:
+                try:
+                    os.replace(tmp_paths[i], batch[i][0])
+                except OSError as e:
+                    errors[i] = e
+            if errors[i] is not None:
+                _discard(tmp_paths[i])
+
+        return errors
+
+    def _submit_writes(self, batch: List[Tuple[Path, bytes]], fds: List[int], pending: List[int], errors: List[Optional[Exception]]) -> None:
+        for i in pending:
+            sqe = liburing.io_uring_get_sqe(self._ring)
+            liburing.io_uring_prep_write(sqe, fds[i], batch[i][1], 0)
+            liburing.io_uring_sqe_set_data64(sqe, i)
+
+        liburing.io_uring_submit_and_wait(self._ring, len(pending))
+
+        for _ in pending:
+            liburing.io_uring_wait_cqe(self._ring, self._cqe)
+            cqe = self._cqe[0]
+            i = liburing.io_uring_cqe_get_data64(cqe)
+            written = cqe.res
+            liburing.io_uring_cqe_seen(self._ring, cqe)
+
+            data = batch[i][1]
+            try:
+                if written < 0:
+                    raise OSError(-written, os.strerror(-written), str(batch[i][0]))
+                if written < len(data):
+                    _pwrite_all(fds[i], data[written:], written)
+            except OSError as e:
+                errors[i] = e
+
+class TranscriptWriter:
+    """Write transcript files on a background thread so fetch workers never wait on disk"""
+
+    def __init__(self, console: Console, use_io_uring: bool = False, compress: bool = False, max_batch: int = 16, max_pending: int = 64):
+        self.console = console
+        self.compress = compress
+        self.max_batch = max_batch
+        self.failed = 0
+        self.io_uring = IoUringWriter() if use_io_uring else None
+
+        self._queue: "queue.Queue[Optional[Tuple[Path, Sequence[str], str]]]" = queue.Queue(maxsize=max_pending)
+        self._thread = threading.Thread(target=self._run, name="transcript-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, path: Path, lines: Sequence[str], message: str) -> None:
+        """Queue a transcript write, printing message once it is on disk"""
+        self._queue.put((path, lines, message))
+
+    def close(self) -> None:
+        """Flush pending writes and stop the writer thread"""
+        self._queue.put(None)
+        self._thread.join()
+        if self.io_uring is not None:
+            self.io_uring.close()
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+
+            batch = [item]
+            stop = False
+            while len(batch) < self.max_batch:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+
+            try:
+                errors = self._write_batch(batch)
+            except Exception as e:
+                errors = [e] * len(batch)
+            self._report(batch, errors)
+            
+            if stop:
+                return
+
+    def _write_batch(self, batch: List[Tuple[Path, Sequence[str], str]]) -> List[Optional[Exception]]:
+        errors: List[Optional[Exception]] = []
+        
+        if self.io_uring is not None:
+            # The ring needs each file as one buffer, so only this path joins the lines
+            encoded: List[Tuple[Path, bytes]] = []
+            encoded_indexes: List[int] = []
+            for i, (path, lines, _) in enumerate(batch):
+                try:
+                    encoded.append((path, self._encode(lines)))
+                    encoded_indexes.append(i)
+                    errors.append(None)
+                except Exception as e:
+                    errors.append(e)
+            
+            if encoded:
+                for i, error in zip(encoded_indexes, self.io_uring.write_batch(encoded)):
+                    errors[i] = error
+        else:
+            for path, lines, _ in batch:
+                try:
+                    write_lines(path, lines, self.compress)
+                    errors.append(None)
+                except Exception as e:
+                    errors.append(e)
+        
+        return errors
+
+    def _report(self, batch: List[Tuple[Path, Sequence[str], str]], errors: List[Optional[Exception]]) -> None:
+        for (path, _, message), error in zip(batch, errors):
+            if error is not None:
+                self.failed += 1
+            
+            try:
+                if error is None:
+                    self.console.print(message)
+                else:
+                    self.console.print(f"[red]✗[/red] Failed to write transcript {path.name}: {error}")
+            except Exception:
+                pass
+
+    def _encode(self, lines: Sequence[str]) -> bytes:
+        data = '\n'.join(lines).encode('utf-8')
+        if self.compress:
+            return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+        return data